@@ -1,41 +1,67 @@
-import datetime
-from dateutil.relativedelta import relativedelta
+import os
+import json
+import pandas as pd
 
-def generate_nse_urls(years=10):
+# Every archive URL is URL_PREFIX + DDMMYY + URL_SUFFIX
+URL_PREFIX = "https://nsearchives.nseindia.com/content/equities/mrg_trading_"
+URL_SUFFIX = ".zip"
+
+# Hand-maintained NSE trading calendar; edit it when NSE announces new holidays
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nse_holidays.json')
+
+def load_trading_calendar(filename=HOLIDAYS_FILE):
+    """
+    Load NSE holidays and special weekend sessions from a JSON file
+    
+    Args:
+        filename (str): Path of the JSON file with "holidays" and "special_sessions" date lists
+        
+    Returns:
+        tuple: (holidays, special_sessions) as pandas.DatetimeIndex
+    """
+    try:
+        with open(filename, 'r') as f:
+            calendar = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read holiday calendar ({e}), skipping weekends only")
+        calendar = {}
+    
+    holidays = pd.DatetimeIndex(calendar.get('holidays', []))
+    special_sessions = pd.DatetimeIndex(calendar.get('special_sessions', []))
+    return holidays, special_sessions
+
+def generate_nse_urls(years=10, trading_days_only=True):
     """
-    Generate NSE margin trading data URLs for the specified number of years for ALL days.
+    Generate NSE margin trading data URLs for the specified number of years.
     
     Args:
         years (int): Number of years to look back from today
+        trading_days_only (bool): If True, skip weekends and NSE holidays (no report is published)
         
     Returns:
         list: List of all URLs
     """
     # Start from today
-    today = datetime.datetime.now()
+    today = pd.Timestamp.today().normalize()
     
     # Calculate the start date (years ago)
-    start_date = today - relativedelta(years=years)
+    start_date = today - pd.DateOffset(years=years)
     
-    # Initialize empty list to store URLs
-    urls = []
+    days = pd.date_range(start=start_date, end=today, freq='D')
     
-    # Iterate through each day from start_date to today
-    current_date = start_date
-    while current_date <= today:
-        # Format date as DDMMYY
-        date_str = current_date.strftime("%d%m%y")
-        
-        # Construct URL
-        url = f"https://nsearchives.nseindia.com/content/equities/mrg_trading_{date_str}.zip"
-        
-        # Add URL to list
-        urls.append(url)
-        
-        # Move to next day
-        current_date += datetime.timedelta(days=1)
+    # Drop weekends and holidays, but keep special weekend sessions (e.g. Budget day)
+    if trading_days_only:
+        holidays, special_sessions = load_trading_calendar()
+        is_trading_day = (days.weekday < 5) & ~days.isin(holidays)
+        days = days[is_trading_day | days.isin(special_sessions)]
     
-    return urls
+    # Format every day as DDMMYY in one vectorized pass
+    dates = days.strftime("%d%m%y")
+    
+    # Construct URLs
+    urls = URL_PREFIX + dates + URL_SUFFIX
+    
+    return urls.tolist()
 
 def save_urls_to_file(urls, filename="nse_urls_all_days.txt"):
     """
@@ -45,17 +71,17 @@ def save_urls_to_file(urls, filename="nse_urls_all_days.txt"):
         urls (list): List of URLs
         filename (str): Name of output file
     """
+    # Let the file buffer batch the lines instead of a write() call per URL
     with open(filename, 'w') as f:
-        for url in urls:
-            f.write(url + '\n')
+        f.writelines(url + '\n' for url in urls)
     print(f"Saved {len(urls)} URLs to {filename}")
 
 def main():
-    # Generate URLs for last 10 years (all days)
+    # Generate URLs for last 10 years (trading days only)
     urls = generate_nse_urls(years=10)
     
     # Print the total number of URLs generated
-    print(f"Generated {len(urls)} URLs for all days in the last 10 years")
+    print(f"Generated {len(urls)} URLs for trading days in the last 10 years")
     
     # Print the first and last 3 URLs as examples
     print("\nFirst 3 URLs:")
@@ -4,161 +4,532 @@ NSE Archive Downloader Script
 
 This script downloads NSE margin trading data from a list of URLs.
 It first gets cookies from NSE website to authenticate requests
-and shows progress while downloading files.
+and then downloads several files concurrently while showing progress.
+With --extract-dir, each archive is extracted straight from memory as it
+arrives, so the zip never has to be written to disk and read back.
 """
 
+import io
 import os
 import time
+import random
+import logging
+import asyncio
 import argparse
-import requests
+import datetime
+import tempfile
+import contextlib
+from types import MappingProxyType
+import httpx
+import orjson
+from aiolimiter import AsyncLimiter
 from pathlib import Path
 from tqdm import tqdm
 from urllib.parse import urlparse
+from mtf_extract import DATE_RE, extract_zip
 
 # Custom User-Agent to mimic Chrome browser
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.54 Safari/537.36'
 
-# Default headers for all requests
-HEADERS = {
-    'authority': 'www.nseindia.com',
-    'accept': '*/*',
-    'accept-language': 'en',
-    'dnt': '1',
+# Default headers for all requests; kept minimal since we only fetch static archives,
+# and read-only because the same mapping is shared by every request
+HEADERS = MappingProxyType({
     'user-agent': USER_AGENT,
-    'x-requested-with': 'XMLHttpRequest'
-}
+    'accept': '*/*',
+    'accept-encoding': 'gzip, deflate'
+})
+
+# Read the response in large chunks and buffer writes so the kernel sees few, large write() calls
+CHUNK_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Permissions for new files, as open() would give them; read once at import while single-threaded
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+# Refresh NSE cookies after this many seconds, before they go stale on long runs
+COOKIE_TTL = 15 * 60
+
+# After a failed refresh, reuse that result for this many seconds instead of retrying per download
+COOKIE_RETRY_DELAY = 30
+
+# Per-file log (inside the output directory); the progress bar only shows counts
+LOG_FILE = 'download.log'
+
+# Sidecar file (inside the output directory) holding ETag/Last-Modified per file
+ETAG_CACHE_FILE = '.etag_cache.json'
+
+# Sidecar file (inside the extract directory) listing archives already extracted there
+EXTRACTED_FILE = '.extracted.json'
+
+# Sidecar file (inside the output directory) listing archive names known to return 404
+NOT_FOUND_FILE = '.not_found.json'
+
+# Rewrite the 404 cache after this many new entries, so an aborted run keeps most of them
+NOT_FOUND_SAVE_EVERY = 50
+
+# Reports younger than this may simply not be published yet, so their 404s are not cached
+NOT_FOUND_GRACE_DAYS = 7
+
+# Exponential backoff between retries: base * 2^n seconds, capped, plus random jitter
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+BACKOFF_JITTER = 0.5
+
+# Upper bound on a server-requested Retry-After, since the wait holds a download slot
+RETRY_AFTER_CAP = 120.0
+
+def is_recent_report(filename, days=NOT_FOUND_GRACE_DAYS):
+    """
+    Check whether a report file is dated within the last few days.
+    
+    Args:
+        filename (str): Archive name in the mrg_trading_DDMMYY.zip format
+        days (int): Size of the window in days
+        
+    Returns:
+        bool: True if the report date is recent, False otherwise or if it cannot be parsed
+    """
+    match = DATE_RE.search(filename)
+    if not match:
+        return False
+    
+    try:
+        day, month, year = match.groups()
+        report_date = datetime.date(2000 + int(year), int(month), int(day))
+    except ValueError:
+        return False
+    
+    return (datetime.date.today() - report_date).days < days
+
+def backoff_delay(retries, retry_after=None):
+    """
+    Compute how long to wait before the next retry.
+    
+    Args:
+        retries (int): Number of attempts that have failed so far (1 for the first retry)
+        retry_after (str): Value of the server's Retry-After header, if any
+        
+    Returns:
+        float: Number of seconds to sleep
+    """
+    # Honor the server's explicit request when it gives one in seconds, within reason
+    try:
+        if retry_after and int(retry_after) > 0:
+            return min(float(retry_after), RETRY_AFTER_CAP)
+    except ValueError:
+        pass
+    
+    # Jitter keeps concurrent workers from retrying in lockstep
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * (2 ** (retries - 1)))
+    return delay * (1 + random.uniform(0, BACKOFF_JITTER))
 
-def get_cookies():
+def load_json(path, default):
+    """
+    Load a JSON cache file, falling back to a default when it is missing or unreadable.
+    
+    Args:
+        path (str): Path of the JSON file
+        default: Value to return if the file cannot be loaded
+        
+    Returns:
+        The decoded JSON content, or default
+    """
+    try:
+        return orjson.loads(Path(path).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return default
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """
+    Open a temporary file next to path and move it into place only once the block completes.
+    
+    An interrupted or failed write leaves any existing file at path untouched. The file
+    gets the usual umask-derived permissions rather than mkstemp's owner-only 0600.
+    
+    Args:
+        path (str): Final path of the file
+        
+    Yields:
+        file: Buffered binary file object to write to
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with open(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            yield f
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def save_json(path, data):
+    """
+    Atomically write data as JSON so an interrupted run never leaves a corrupt cache.
+    
+    Args:
+        path (str): Path of the JSON file
+        data: JSON-serializable content
+    """
+    with atomic_write(path) as f:
+        f.write(orjson.dumps(data))
+
+async def get_cookies(client):
     """
     Visit NSE website to get cookies necessary for authenticated requests.
     
+    Args:
+        client (httpx.AsyncClient): Client whose cookie jar receives the cookies
+    
     Returns:
-        requests.cookies.RequestsCookieJar: The cookie jar with authenticated cookies
+        bool: True if the cookies were collected, False otherwise
     """
-    print("Getting cookies from NSE website...")
+    tqdm.write("Getting cookies from NSE website...")
     
     # URL to visit for cookies
     cookie_url = 'https://www.nseindia.com/products-services/equity-derivatives-individual-securities'
     
-    # Create a session to maintain cookies
-    session = requests.Session()
-    
     try:
         # Visit the NSE website to get cookies
-        response = session.get(cookie_url, headers=HEADERS, timeout=30)
+        response = await client.get(cookie_url)
         response.raise_for_status()
         
-        # Return the cookies
-        print(f"Successfully got cookies. Collected {len(session.cookies)} cookies.")
-        return session.cookies
+        tqdm.write(f"Successfully got cookies. Collected {len(client.cookies)} cookies.")
+        return True
+    
+    except httpx.HTTPError as e:
+        tqdm.write(f"Error getting cookies: {e}")
+        return False
+
+class CookieManager:
+    """
+    Keep the client's NSE cookies fresh during long downloads.
+    
+    Cookies are refreshed once they are older than the TTL, or on demand when NSE
+    rejects a request. Concurrent downloads share a single refresh, and a failed
+    refresh is not retried for COOKIE_RETRY_DELAY seconds.
+    """
+    
+    def __init__(self, client, ttl=COOKIE_TTL):
+        """
+        Args:
+            client (httpx.AsyncClient): Client whose cookies are managed
+            ttl (float): Number of seconds before cookies are considered stale
+        """
+        self.client = client
+        self.ttl = ttl
+        self.expires_at = 0
+        self.attempted_at = 0
+        self.valid = False
+        self._lock = asyncio.Lock()
+    
+    async def get(self):
+        """
+        Make sure the cookies are fresh, refreshing them if the TTL has passed.
+        
+        Returns:
+            bool: True if the client holds fresh cookies, False otherwise
+        """
+        if time.monotonic() < self.expires_at:
+            return self.valid
+        return await self.refresh()
     
-    except requests.exceptions.RequestException as e:
-        print(f"Error getting cookies: {e}")
-        return None
+    async def refresh(self, force=False):
+        """
+        Fetch new cookies from NSE.
+        
+        Args:
+            force (bool): If True, refresh even though the TTL of valid cookies has not passed
+            
+        Returns:
+            bool: True if the client holds fresh cookies, False otherwise
+        """
+        requested_at = time.monotonic()
+        async with self._lock:
+            # Another download may have refreshed the cookies (or failed to) while we waited for the lock
+            if self.attempted_at > requested_at:
+                return self.valid
+            # Forcing only skips the TTL of valid cookies, not the wait after a failure
+            if requested_at < self.expires_at and not (force and self.valid):
+                return self.valid
+            
+            self.valid = await get_cookies(self.client)
+            self.attempted_at = time.monotonic()
+            self.expires_at = self.attempted_at + (self.ttl if self.valid else COOKIE_RETRY_DELAY)
+            return self.valid
 
-def download_file(url, cookies, output_dir, delay=1, max_retries=3):
+async def download_file(client, sem, limiter, cookies, url, output_dir, existing, validators, not_found,
+                        revalidate=False, extract_dir=None, extracted=None, organize=True,
+                        keep_zip=False, max_retries=3):
     """
-    Download a file from the given URL using the provided cookies.
+    Download a file from the given URL using the provided client.
     
     Args:
+        client (httpx.AsyncClient): Client holding authentication cookies
+        sem (asyncio.Semaphore): Semaphore bounding the number of concurrent streams
+        limiter (AsyncLimiter): Rate limiter shared by all downloads
+        cookies (CookieManager): Keeps the client's authentication cookies fresh
         url (str): The URL of the file to download
-        cookies (requests.cookies.RequestsCookieJar): Cookies for authentication
         output_dir (str): Directory to save the downloaded file
-        delay (int): Number of seconds to wait after download
+        existing (set): Names of files already in output_dir; updated in place
+        validators (dict): Maps filename -> {'etag', 'last_modified'}; updated in place
+        not_found (set): Names of files known to return 404; updated in place
+        revalidate (bool): If True, re-check existing files with a conditional GET
+            and probe files in the 404 cache again
+        extract_dir (Path): If set, extract the archive here straight from memory
+        extracted (set): Names of archives already extracted to extract_dir; updated in place
+        organize (bool): If True, extract into year/month subdirectories
+        keep_zip (bool): If True, also save the archive when extracting
         max_retries (int): Maximum number of retry attempts
-        
+    
     Returns:
-        bool: True if download was successful, False otherwise
+        tuple: (success, message)
     """
     # Parse filename from URL
     parsed_url = urlparse(url)
     filename = os.path.basename(parsed_url.path)
     output_path = os.path.join(output_dir, filename)
     
-    # Skip if file already exists
-    if os.path.exists(output_path):
-        return (True, f"Skipped (already exists): {filename}")
+    # Skip if we already have the requested output, unless we can cheaply ask NSE whether it changed
+    request_headers = {}
+    cached = validators.get(filename)
+    have_output = filename in existing if extract_dir is None else filename in extracted
+    if have_output:
+        if revalidate and cached:
+            if cached.get('etag'):
+                request_headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                request_headers['If-Modified-Since'] = cached['last_modified']
+        
+        if not request_headers:
+            return (True, f"Skipped (already exists): {filename}")
+    
+    # A zip from an earlier run is on disk but not extracted yet; extract it instead of downloading
+    elif extract_dir is not None and filename in existing:
+        ok, _, message = await asyncio.to_thread(
+            extract_zip, Path(output_path), filename, extract_dir, organize)
+        if ok:
+            extracted.add(filename)
+        return (ok, message)
+    
+    # Don't probe URLs that already returned 404 on an earlier run, unless revalidating
+    if filename in not_found and not revalidate:
+        return (True, f"Skipped (cached 404): {filename}")
     
     # Initialize retry counter
     retries = 0
+    cookies_refreshed = False
     
-    while retries < max_retries:
-        try:
-            # Download the file
-            response = requests.get(
-                url, 
-                headers=HEADERS, 
-                cookies=cookies, 
-                stream=True,
-                timeout=30
-            )
-            
-            # Check if request was successful
-            response.raise_for_status()
-            
-            # Check if we got an empty file or error page (suspicious small size)
-            if int(response.headers.get('content-length', 0)) < 100:
-                # If size is small, check if it contains error text
-                content_sample = response.content[:100].decode('utf-8', errors='ignore')
-                if 'error' in content_sample.lower() or 'not found' in content_sample.lower():
-                    return (False, f"Error page received for: {filename}")
-            
-            # Save the file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # Wait to avoid overwhelming the server
-            time.sleep(delay)
-            
-            return (True, f"Downloaded: {filename}")
+    async with sem:
+        while retries < max_retries:
+            try:
+                # Refresh stale cookies, then wait for a slot in the shared request rate;
+                # without fresh cookies, try anyway since NSE may still accept the old ones
+                if not await cookies.get():
+                    logging.warning(f"No fresh NSE cookies, trying {filename} with the current ones")
+                await limiter.acquire()
+                
+                # Download the file
+                async with client.stream('GET', url, headers=request_headers) as response:
+                    # Unchanged on the server, keep the local copy
+                    if response.status_code == 304:
+                        return (True, f"Skipped (not modified): {filename}")
+                    
+                    # Check if request was successful
+                    response.raise_for_status()
+                    
+                    # Check if we got an empty file or error page (suspicious small size),
+                    # looking only at the first chunk rather than trusting content-length
+                    chunks = response.aiter_bytes(CHUNK_SIZE)
+                    first_chunk = await anext(chunks, b'')
+                    if len(first_chunk) < 100:
+                        # If size is small, check if it contains error text
+                        content_sample = first_chunk.decode('utf-8', errors='ignore')
+                        if 'error' in content_sample.lower() or 'not found' in content_sample.lower():
+                            return (False, f"Error page received for: {filename}")
+                    
+                    if extract_dir is None:
+                        # Save the file, keeping disk writes off the event loop; the old copy
+                        # (when revalidating) is only replaced once the whole body has arrived
+                        with atomic_write(output_path) as f:
+                            await asyncio.to_thread(f.write, first_chunk)
+                            async for chunk in chunks:
+                                await asyncio.to_thread(f.write, chunk)
+                    else:
+                        # Archives are small, so keep the whole zip in memory
+                        buffer = io.BytesIO()
+                        buffer.write(first_chunk)
+                        async for chunk in chunks:
+                            buffer.write(chunk)
+                    
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                
+                message = f"Downloaded: {filename}"
+                if extract_dir is not None:
+                    # Extract straight from memory; zlib releases the GIL, so a thread is enough
+                    buffer.seek(0)
+                    ok, _, message = await asyncio.to_thread(
+                        extract_zip, buffer, filename, extract_dir, organize)
+                    if not ok:
+                        return (False, message)
+                    extracted.add(filename)
+                    
+                    if keep_zip:
+                        with atomic_write(output_path) as f:
+                            await asyncio.to_thread(f.write, buffer.getbuffer())
+                
+                if extract_dir is None or keep_zip:
+                    existing.add(filename)
+                not_found.discard(filename)
+                
+                # Remember validators so later runs can issue conditional GETs
+                if etag or last_modified:
+                    validators[filename] = {'etag': etag, 'last_modified': last_modified}
+                
+                return (True, message)
             
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                # File not found, no need to retry
-                return (False, f"File not found (404): {filename}")
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    # Remember the miss, unless the report may just not be published yet
+                    if not is_recent_report(filename):
+                        not_found.add(filename)
+                        if len(not_found) % NOT_FOUND_SAVE_EVERY == 0:
+                            save_json(os.path.join(output_dir, NOT_FOUND_FILE), sorted(not_found))
+                    
+                    # File not found, no need to retry
+                    return (False, f"File not found (404): {filename}")
+                
+                # NSE rejected our cookies; fetch new ones and try once more without counting a retry.
+                # If the refresh fails, fall through and treat it as an ordinary HTTP error.
+                if e.response.status_code in (401, 403) and not cookies_refreshed:
+                    cookies_refreshed = True
+                    logging.warning(f"HTTP error ({e.response.status_code}) for {filename}, refreshing cookies...")
+                    if await cookies.refresh(force=True):
+                        continue
+                
+                # For other HTTP errors, retry
+                retries += 1
+                if retries < max_retries:
+                    logging.warning(f"HTTP error ({e.response.status_code}) for {filename}, retrying ({retries}/{max_retries})...")
+                    await asyncio.sleep(backoff_delay(retries, e.response.headers.get('Retry-After')))
+                else:
+                    return (False, f"Failed after {max_retries} retries: {filename}")
             
-            # For other HTTP errors, retry
-            retries += 1
-            if retries < max_retries:
-                print(f"HTTP error ({e.response.status_code}), retrying ({retries}/{max_retries})...")
-                time.sleep(delay * 2)  # Longer delay on errors
-            else:
-                return (False, f"Failed after {max_retries} retries: {filename}")
+            except httpx.RequestError as e:
+                # Network error, retry
+                retries += 1
+                if retries < max_retries:
+                    logging.warning(f"Network error for {filename}, retrying ({retries}/{max_retries}): {e}")
+                    await asyncio.sleep(backoff_delay(retries))
+                else:
+                    return (False, f"Network error after {max_retries} retries: {filename}")
+
+async def download_all(urls, output_dir, validators, not_found, revalidate=False,
+                       rate=5.0, concurrency=32, extract_dir=None, extracted=None, organize=True,
+                       keep_zip=False):
+    """
+    Download all URLs concurrently, multiplexed over a few HTTP/2 connections.
+    
+    Args:
+        urls (list): URLs to download
+        output_dir (Path): Directory to save the downloaded files
+        validators (dict): ETag/Last-Modified cache, updated in place
+        not_found (set): Names of files known to return 404, updated in place
+        revalidate (bool): If True, re-check existing files and files in the 404 cache
+        rate (float): Maximum number of requests per second across all downloads
+        concurrency (int): Maximum number of request streams in flight at once
+        extract_dir (Path): If set, extract each archive here straight from memory
+        extracted (set): Names of archives already extracted to extract_dir, updated in place
+        organize (bool): If True, extract into year/month subdirectories
+        keep_zip (bool): If True, also save the archives when extracting
+    
+    Returns:
+        list: (success, message) tuples in the order of urls, or None if
+        the authentication cookies could not be obtained
+    """
+    # Few connections, many streams each; waiting for a free stream is bounded by sem, not a timeout
+    limits = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+    timeout = httpx.Timeout(30.0, pool=None)
+    
+    async with httpx.AsyncClient(http2=True, limits=limits, timeout=timeout, headers=HEADERS,
+                                 follow_redirects=True) as client:
+        # Get authentication cookies
+        cookies = CookieManager(client)
+        if not await cookies.get():
+            return None
+        
+        # Keep the number of requests in flight and their aggregate rate polite towards NSE
+        sem = asyncio.Semaphore(concurrency)
+        limiter = AsyncLimiter(max_rate=rate, time_period=1.0)
+        
+        # One directory scan instead of a stat() per URL
+        existing = {entry.name for entry in os.scandir(output_dir)}
+        
+        # Throttle redraws; per-file messages go to the log instead of the bar
+        with tqdm(total=len(urls), desc="Downloading", unit="file",
+                  mininterval=0.5, miniters=16) as pbar:
+            async def run(url):
+                success, message = await download_file(client, sem, limiter, cookies, url, output_dir,
+                                                       existing, validators, not_found, revalidate,
+                                                       extract_dir, extracted, organize, keep_zip)
                 
-        except requests.exceptions.RequestException as e:
-            # Network error, retry
-            retries += 1
-            if retries < max_retries:
-                print(f"Network error, retrying ({retries}/{max_retries}): {e}")
-                time.sleep(delay * 3)  # Even longer delay on network errors
-            else:
-                return (False, f"Network error after {max_retries} retries: {filename}")
+                logging.log(logging.INFO if success else logging.WARNING, message)
+                pbar.update(1)
+                return success, message
+            
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(run(url)) for url in urls]
+    
+    return [task.result() for task in tasks]
 
 def main():
     """Main function to parse arguments and coordinate downloading"""
     
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Download NSE margin trading data files')
-    parser.add_argument('--input', '-i', type=str, default='nse_urls.txt', 
+    parser.add_argument('--input', '-i', type=str, default='nse_urls.txt',
                         help='Input file containing URLs to download (one per line)')
     parser.add_argument('--output-dir', '-o', type=str, default='data',
                         help='Directory to save downloaded files')
-    parser.add_argument('--delay', '-d', type=float, default=1.0,
-                        help='Delay in seconds between downloads (default: 1.0)')
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help='Maximum requests per second across all downloads (default: 5)')
+    parser.add_argument('--concurrency', '-c', type=int, default=32,
+                        help='Maximum number of concurrent request streams (default: 32)')
     parser.add_argument('--max-files', '-m', type=int, default=0,
                         help='Maximum number of files to download (0 for unlimited)')
+    parser.add_argument('--revalidate', '-r', action='store_true',
+                        help='Re-check existing files with conditional GETs and refresh changed ones, '
+                             'and retry files that returned 404 on earlier runs')
+    parser.add_argument('--extract-dir', '-e', type=str, default=None,
+                        help='Extract each archive into this directory as it downloads, without saving the zip')
+    parser.add_argument('--keep-zip', '-k', action='store_true',
+                        help='With --extract-dir, also save the downloaded zip files')
+    parser.add_argument('--flat', '-f', action='store_true',
+                        help='With --extract-dir, extract to a flat directory instead of organizing by year/month')
     args = parser.parse_args()
     
     # Create output directory if it doesn't exist
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Get authentication cookies
-    cookies = get_cookies()
-    if not cookies:
-        print("Failed to get authentication cookies. Exiting.")
-        return
+    # Extract while downloading if requested
+    extract_dir = None
+    if args.extract_dir:
+        extract_dir = Path(args.extract_dir)
+        extract_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Set up logging
+    log_path = output_dir / LOG_FILE
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(log_path)]
+    )
+    # httpx logs every request at INFO; keep the log to one line per file
+    logging.getLogger('httpx').setLevel(logging.WARNING)
     
     # Read URLs from file
     try:
@@ -175,35 +546,63 @@ def main():
         print(f"Limiting to {args.max_files} downloads as specified")
         urls = urls[:args.max_files]
     
+    # Load ETag/Last-Modified validators from previous runs
+    cache_path = output_dir / ETAG_CACHE_FILE
+    validators = load_json(cache_path, {})
+    
+    # Load files that returned 404 on previous runs
+    not_found_path = output_dir / NOT_FOUND_FILE
+    not_found = set(load_json(not_found_path, []))
+    
+    # Load archives already extracted to the requested directory
+    extracted = None
+    if extract_dir is not None:
+        extracted_path = extract_dir / EXTRACTED_FILE
+        extracted = set(load_json(extracted_path, []))
+    
     # Download files with progress bar
+    try:
+        results = asyncio.run(download_all(urls, output_dir, validators, not_found,
+                                           args.revalidate, args.rate, args.concurrency,
+                                           extract_dir, extracted, not args.flat, args.keep_zip))
+    finally:
+        save_json(cache_path, validators)
+        save_json(not_found_path, sorted(not_found))
+        if extracted is not None:
+            save_json(extracted_path, sorted(extracted))
+    
+    if results is None:
+        print("Failed to get authentication cookies. Exiting.")
+        return
+    
+    # Update stats
     success_count = 0
     fail_count = 0
     skipped_count = 0
+    missing_count = 0
     
-    with tqdm(total=len(urls), desc="Downloading", unit="file") as pbar:
-        for url in urls:
-            success, message = download_file(url, cookies, output_dir, args.delay)
-            
-            # Update stats
-            if success:
-                if "Skipped" in message:
-                    skipped_count += 1
-                else:
-                    success_count += 1
+    for success, message in results:
+        if success:
+            if "cached 404" in message:
+                missing_count += 1
+            elif "Skipped" in message:
+                skipped_count += 1
             else:
-                fail_count += 1
-            
-            # Update progress bar with message
-            pbar.set_postfix_str(message)
-            pbar.update(1)
+                success_count += 1
+        else:
+            fail_count += 1
     
     # Print summary
     print("\nDownload Summary:")
     print(f"  Total URLs: {len(urls)}")
     print(f"  Successfully downloaded: {success_count}")
     print(f"  Skipped (already exist): {skipped_count}")
+    print(f"  Skipped (known missing, 404 on an earlier run): {missing_count}")
     print(f"  Failed: {fail_count}")
     print(f"All files saved to: {output_dir.absolute()}")
+    if extract_dir is not None:
+        print(f"All files extracted to: {extract_dir.absolute()}")
+    print(f"Details logged to: {log_path.absolute()}")
 
 if __name__ == "__main__":
     main()
@@ -7,16 +7,103 @@ showing progress and handling errors.
 """
 
 import os
+import shutil
 import zipfile
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from tqdm import tqdm
-import csv
-import pandas as pd
-import datetime
 import re
 
-def extract_all_zips(input_dir, output_dir, organize_by_year_month=True):
+# Archive names look like mrg_trading_DDMMYY.zip
+DATE_RE = re.compile(r'mrg_trading_(\d{2})(\d{2})(\d{2})\.zip')
+
+# Read/write buffer used when copying members out of a zip (extractall uses 8 KiB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def _copy_members(zip_ref, extract_dir):
+    """
+    Copy every member of an open zip file into extract_dir with large buffered I/O.
+    
+    Args:
+        zip_ref (zipfile.ZipFile): Open zip file
+        extract_dir (Path): Directory to extract files to
+    """
+    root = extract_dir.resolve()
+    for info in zip_ref.infolist():
+        if info.is_dir():
+            continue
+        
+        # Refuse members that would escape the target directory (extractall sanitizes these)
+        target = (root / info.filename).resolve()
+        if not target.is_relative_to(root):
+            raise ValueError(f"unsafe path in archive: {info.filename}")
+        
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with zip_ref.open(info) as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, length=COPY_BUFFER_SIZE)
+
+def extract_zip(source, zip_name, output_dir, organize=True):
+    """
+    Extract a single zip file, either from disk or from an in-memory buffer.
+    
+    Args:
+        source (Path or file-like): Zip file path, or a binary file object such as io.BytesIO
+        zip_name (str): Name of the archive, used to find its date and in messages
+        output_dir (Path): Directory to extract files to
+        organize (bool): If True, extract into a year/month subdirectory
+    
+    Returns:
+        tuple: (ok, files_extracted, message)
+    """
+    try:
+        # Parse date from filename (format: mrg_trading_DDMMYY.zip)
+        date_match = DATE_RE.search(zip_name)
+        
+        if date_match and organize:
+            day, month, year = date_match.groups()
+            # Assume 20xx for year
+            full_year = f"20{year}"
+            # Create year/month subdirectory
+            extract_dir = output_dir / full_year / month
+            extract_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            # Use output directory directly
+            extract_dir = output_dir
+        
+        # Extract the zip file
+        with zipfile.ZipFile(source, 'r') as zip_ref:
+            # Get list of files in the zip
+            file_list = zip_ref.namelist()
+            
+            # Extract all files
+            _copy_members(zip_ref, extract_dir)
+            
+            return True, len(file_list), f"Extracted {len(file_list)} file(s) from {zip_name} to {extract_dir}"
+            
+    except zipfile.BadZipFile:
+        return False, 0, f"Error: {zip_name} is not a valid zip file"
+    except Exception as e:
+        return False, 0, f"Error extracting {zip_name}: {str(e)}"
+
+def _extract_one(zip_file, output_dir, organize):
+    """
+    Extract a single zip file on disk; runs inside a worker process.
+    
+    The zip is opened inside the worker so no zip handle is pickled across processes.
+    
+    Args:
+        zip_file (Path): Zip file to extract
+        output_dir (Path): Directory to extract files to
+        organize (bool): If True, extract into a year/month subdirectory
+    
+    Returns:
+        tuple: (ok, files_extracted, message)
+    """
+    return extract_zip(zip_file, zip_file.name, output_dir, organize)
+
+def extract_all_zips(input_dir, output_dir, organize_by_year_month=True, workers=None):
     """
     Extract all zip files from the input directory to the output directory.
     
@@ -24,6 +111,7 @@ def extract_all_zips(input_dir, output_dir, organize_by_year_month=True):
         input_dir (str): Directory containing zip files
         output_dir (str): Directory to extract files to
         organize_by_year_month (bool): If True, organize extracted files by year/month subdirectories
+        workers (int): Number of worker processes (defaults to the number of CPUs)
     
     Returns:
         tuple: (success_count, fail_count, total_files_extracted)
@@ -47,44 +135,22 @@ def extract_all_zips(input_dir, output_dir, organize_by_year_month=True):
     fail_count = 0
     total_files_extracted = 0
     
-    # Process each zip file with progress bar
-    for zip_file in tqdm(zip_files, desc="Extracting", unit="zip"):
-        try:
-            # Parse date from filename (format: mrg_trading_DDMMYY.zip)
-            date_match = re.search(r'mrg_trading_(\d{2})(\d{2})(\d{2})\.zip', zip_file.name)
-            
-            if date_match and organize_by_year_month:
-                day, month, year = date_match.groups()
-                # Assume 20xx for year
-                full_year = f"20{year}"
-                # Create year/month subdirectory
-                extract_dir = output_path / full_year / month
-                extract_dir.mkdir(parents=True, exist_ok=True)
-            else:
-                # Use output directory directly
-                extract_dir = output_path
-            
-            # Extract the zip file
-            with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                # Get list of files in the zip
-                file_list = zip_ref.namelist()
-                
-                # Extract all files
-                zip_ref.extractall(extract_dir)
-                
+    # Decompression is CPU-bound and every zip is independent, so spread them over processes
+    extract = partial(_extract_one, output_dir=output_path, organize=organize_by_year_month)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = executor.map(extract, zip_files, chunksize=16)
+        
+        # Process each result with progress bar
+        for ok, files_extracted, message in tqdm(results, total=len(zip_files), desc="Extracting", unit="zip"):
+            if ok:
                 # Update counters
-                total_files_extracted += len(file_list)
+                total_files_extracted += files_extracted
                 success_count += 1
-                
-                # Print details about extracted files
-                tqdm.write(f"Extracted {len(file_list)} file(s) from {zip_file.name} to {extract_dir}")
-                
-        except zipfile.BadZipFile:
-            tqdm.write(f"Error: {zip_file.name} is not a valid zip file")
-            fail_count += 1
-        except Exception as e:
-            tqdm.write(f"Error extracting {zip_file.name}: {str(e)}")
-            fail_count += 1
+            else:
+                fail_count += 1
+            
+            # Print details about extracted files
+            tqdm.write(message)
     
     return success_count, fail_count, total_files_extracted
 
@@ -99,13 +165,16 @@ def main():
                         help='Directory to extract files to')
     parser.add_argument('--flat', '-f', action='store_true',
                        help='Extract all files to a flat directory instead of organizing by year/month')
+    parser.add_argument('--workers', '-w', type=int, default=0,
+                        help='Number of worker processes (0 to use all CPUs)')
     args = parser.parse_args()
     
     # Extract all zip files
     success_count, fail_count, total_files_extracted = extract_all_zips(
         args.input_dir, 
         args.output_dir,
-        organize_by_year_month=not args.flat
+        organize_by_year_month=not args.flat,
+        workers=args.workers or None
     )
     
     # Print summary